@@ -1,16 +1,267 @@
 # streamlit_ics_converter.py
 import streamlit as st
 import pandas as pd
-from io import StringIO, BytesIO
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from io import StringIO, BytesIO, TextIOWrapper
 import zipfile
-import json
-from datetime import datetime
+import itertools
+import hashlib
+import orjson
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import re
 
+# Patterns used on every upload; compiled once at import time.
+_SAFE_FN = re.compile(r'[^0-9A-Za-z_.-]')
+_SAFE_SHEET = re.compile(r'[^0-9A-Za-z_]')
+_VEVENT_PROBE = re.compile(rb'BEGIN:VEVENT', re.IGNORECASE)
+
+# Column layout shared by the preview table and every tabular export: export column -> event field
+EVENT_FIELDS = {
+    'uid': 'UID',
+    'summary': 'SUMMARY',
+    'start': 'DTSTART_ISO',
+    'end': 'DTEND_ISO',
+    'location': 'LOCATION',
+    'description': 'DESCRIPTION',
+    'rrule': 'RRULE',
+}
+EXPORT_COLUMNS = ['file', *EVENT_FIELDS]
+
+# bounds for the st.cache_data caches, which live in the server process and are shared by all sessions:
+# room for a couple of sessions' uploads (up to 20 files each) and a few builds of each export
+PARSE_CACHE_ENTRIES = 64
+EXPORT_CACHE_ENTRIES = 4
+CACHE_TTL = 3600  # seconds
+
+# --- Basic ICS parser functions ---
+def unfold_lines(stream):
+    # Unfold lines folded per RFC: lines that start with space or tab are continuations
+    buffered = None
+    for line in stream:
+        line = line.rstrip('\r\n')
+        if buffered is not None and line[:1] in (' ', '\t'):
+            # drop exactly one leading space/tab (RFC 5545 3.1); any further whitespace is part of the value
+            buffered += line[1:]
+            continue
+        if buffered is not None:
+            yield buffered
+        buffered = line
+    if buffered is not None:
+        yield buffered
+
+def build_event(props):
+    # pick common fields, take first value if multiple
+    return {
+        'UID': props.get('UID', [''])[0],
+        'SUMMARY': props.get('SUMMARY', [''])[0],
+        'DESCRIPTION': props.get('DESCRIPTION', [''])[0],
+        'LOCATION': props.get('LOCATION', [''])[0],
+        'DTSTART': props.get('DTSTART', [''])[0],
+        'DTEND': props.get('DTEND', [''])[0],
+        'RRULE': props.get('RRULE', [''])[0],
+        'ORGANIZER': props.get('ORGANIZER', [''])[0],
+        'ATTENDEE': ';'.join(props.get('ATTENDEE', [])) if props.get('ATTENDEE') else ''
+    }
+
+def parse_ics_lines(lines):
+    # returns list of event dicts; single pass over the unfolded lines
+    events = []
+    in_vevent = False
+    props = defaultdict(list)
+    for line in lines:
+        head = line[:12].upper()
+        if head == 'BEGIN:VEVENT':
+            if in_vevent:
+                # previous event was never closed: keep what it had
+                events.append(build_event(props))
+            in_vevent = True
+            props = defaultdict(list)
+            continue
+        if not in_vevent:
+            continue
+        if head[:10] == 'END:VEVENT':
+            events.append(build_event(props))
+            in_vevent = False
+            continue
+        name, sep, val = line.partition(':')
+        if not sep:
+            # fallback: skip lines without a value
+            continue
+        # property may have parameters: e.g., DTSTART;TZID=Asia/Kolkata
+        prop = name.split(';', 1)[0].upper()
+        props[prop].append(val.strip())
+    if in_vevent:
+        # unterminated event at end of file
+        events.append(build_event(props))
+    return events
+
+# calendars repeat the same start/end stamps a lot (all-day and recurring events), so memoize
+@lru_cache(maxsize=4096)
+def normalize_dt(dt_str):
+    if not dt_str: return ''
+    # simple normalizer: remove timezone params if present and parse common forms
+    # handle forms: 20250917T153000Z or 20250917T153000 or 2025-09-17T15:30:00
+    dt = dt_str
+    # remove extra params like "TZID=..."
+    if dt_str.upper().startswith('TZID='):
+        # value may be like: TZID=Asia/Kolkata:20250917T153000
+        parts = dt_str.split(':', 1)
+        if len(parts) == 2:
+            dt = parts[1]
+    # strip trailing Z
+    dt = dt.rstrip('Z')
+    # dispatch on the shape of the value and slice it, instead of trying strptime formats in turn
+    n = len(dt)
+    if n >= 8 and dt[:8].isdigit():
+        date = dt[:4] + '-' + dt[4:6] + '-' + dt[6:8]
+        if n == 8:
+            return date + 'T00:00:00'
+        tm = dt[9:]
+        if dt[8] == 'T' and tm.isdigit():
+            if n == 15:
+                return date + 'T' + tm[:2] + ':' + tm[2:4] + ':' + tm[4:6]
+            if n == 13:
+                return date + 'T' + tm[:2] + ':' + tm[2:4] + ':00'
+    elif n == 19 and dt[4] == '-' and dt[7] == '-' and dt[10] == 'T' and dt[13] == ':' and dt[16] == ':':
+        # already ISO
+        return dt
+    # fallback: return raw
+    return dt_str
+
+@st.cache_data(show_spinner=False, max_entries=PARSE_CACHE_ENTRIES, ttl=CACHE_TTL)
+def parse_one(digest, _raw):
+    # parse one upload's bytes into event dicts; cached on the content digest (the bytes themselves aren't hashed).
+    # decoded incrementally, so no full-text copy of the upload is made
+    raw = _raw
+    if b'BEGIN:VEVENT' not in raw and not _VEVENT_PROBE.search(raw):
+        # no events at all: skip decoding (the plain byte search covers the usual upper-case spelling)
+        return []
+    wrapper = TextIOWrapper(BytesIO(raw), encoding='utf-8', errors='ignore', newline='')
+    events = parse_ics_lines(unfold_lines(wrapper))
+    for ev in events:
+        # normalize dates
+        ev['DTSTART_ISO'] = normalize_dt(ev.get('DTSTART',''))
+        ev['DTEND_ISO'] = normalize_dt(ev.get('DTEND',''))
+    return events
+
+def parse_upload(f):
+    # returns (filename, content digest, events, error message); runs on a worker thread
+    raw = f.getvalue()
+    digest = hashlib.sha256(raw).hexdigest()
+    try:
+        return f.name, digest, parse_one(digest, raw), None
+    except Exception as e:
+        return f.name, digest, None, str(e)
+
+# --- Export helpers ---
+# cached on `uploads`, the tuple of (filename, content digest) the data was built from. The frame and
+# event arguments are underscore-prefixed so Streamlit doesn't hash them: large frames are only
+# sampled (missing edits), and hashing the event dicts costs more than building the export
+def to_csv_bytes(df, chunk_rows=50_000):
+    # Arrow's C++ CSV writer; string fields come out quoted, which is still plain RFC 4180 CSV.
+    # rows are converted and written a chunk at a time, so only one chunk's Arrow copy is alive at once
+    out = BytesIO()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pacsv.CSVWriter(out, schema, write_options=pacsv.WriteOptions(include_header=True)) as writer:
+        for start in range(0, len(df), chunk_rows):
+            writer.write_table(pa.Table.from_pandas(df.iloc[start:start + chunk_rows], schema=schema, preserve_index=False))
+    return out.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=EXPORT_CACHE_ENTRIES, ttl=CACHE_TTL)
+def generate_combined_csv(uploads, _master_df):
+    master_df = _master_df
+    if master_df.empty:
+        return None
+    return to_csv_bytes(master_df)
+
+def iter_file_frames(master_df, filenames):
+    # one frame per uploaded file, in upload order; files without events get an empty frame
+    groups = dict(tuple(master_df.groupby('file', sort=False, observed=True)))
+    empty = master_df.iloc[0:0]
+    for filename in dict.fromkeys(filenames):
+        yield filename, groups.get(filename, empty).drop(columns='file')
+
+@st.cache_data(show_spinner=False, max_entries=EXPORT_CACHE_ENTRIES, ttl=CACHE_TTL)
+def generate_separate_csvs_zip(uploads, _master_df, compresslevel=1):
+    # the CSVs are small, so fast deflate (level 1) by default; level 6 trades time for size
+    master_df = _master_df
+    filenames = [fn for fn, _ in uploads]
+    mem_zip = BytesIO()
+    with zipfile.ZipFile(mem_zip, mode='w', compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zf:
+        for filename, df in iter_file_frames(master_df, filenames):
+            safe_name = _SAFE_FN.sub('_', filename)
+            csv_bytes = to_csv_bytes(df)
+            zf.writestr(safe_name + '.csv', csv_bytes)
+    mem_zip.seek(0)
+    return mem_zip.read()
+
+@st.cache_data(show_spinner=False, max_entries=EXPORT_CACHE_ENTRIES, ttl=CACHE_TTL)
+def generate_excel_bytes(uploads, _master_df):
+    master_df = _master_df
+    filenames = [fn for fn, _ in uploads]
+    out = BytesIO()
+    # free-text fields are written as plain strings rather than being auto-detected as formulas/URLs.
+    # constant_memory is left off: pandas writes cells column by column, which that mode would drop
+    engine_options = {'strings_to_formulas': False, 'strings_to_urls': False}
+    with pd.ExcelWriter(out, engine='xlsxwriter', engine_kwargs={'options': engine_options}) as writer:
+        # Excel sheet names are unique case-insensitively and at most 31 chars; number any clashes
+        sheet_counter = itertools.count(1)
+        seen_sheets = set()
+        for filename, df in iter_file_frames(master_df, filenames):
+            base_name = _SAFE_SHEET.sub('_', filename[:31]) or 'sheet'
+            sheet_name = base_name
+            while sheet_name.lower() in seen_sheets:
+                suffix = f'_{next(sheet_counter)}'
+                sheet_name = base_name[:31 - len(suffix)] + suffix
+            seen_sheets.add(sheet_name.lower())
+            df.to_excel(writer, sheet_name=sheet_name, index=False, na_rep='')
+    out.seek(0)
+    return out.read()
+
+@st.cache_data(show_spinner=False, max_entries=EXPORT_CACHE_ENTRIES, ttl=CACHE_TTL)
+def generate_parquet_bytes(uploads, _master_df):
+    master_df = _master_df
+    if master_df.empty:
+        return None
+    out = BytesIO()
+    master_df.to_parquet(out, engine='pyarrow', compression='zstd', index=False)
+    return out.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=EXPORT_CACHE_ENTRIES, ttl=CACHE_TTL)
+def generate_json_bytes(uploads, _all_parsed, separate=False):
+    all_parsed = _all_parsed
+    if separate:
+        payload = { fn: events for fn, events in all_parsed }
+    else:
+        payload = []
+        for fn, events in all_parsed:
+            for ev in events:
+                o = ev.copy()
+                o['file'] = fn
+                payload.append(o)
+    return orjson.dumps(payload, option=orjson.OPT_INDENT_2)
+
+def prepared_download_button(prepare_label, label, generate, key, upload_id, **kwargs):
+    # only build the export once the user has asked for it. The flag holds the upload_id it was set for,
+    # so new uploads need a fresh click
+    ready_key = key + '_ready'
+    if st.session_state.get(ready_key) != upload_id:
+        # the flag is set in the click callback, before the rerun, so the Prepare button is gone on that rerun
+        st.button(prepare_label, key=key + '_prepare', on_click=st.session_state.__setitem__, args=(ready_key, upload_id))
+        return
+    data = generate()
+    if data is not None:
+        st.download_button(label, data=data, key=key, **kwargs)
+    else:
+        st.button(label, disabled=True)
+
 st.set_page_config(page_title="ICS Converter — Nive Solutions", layout="centered")
 
 # --- CSS / UI styling (mirror-like white cards) ---
-st.markdown("""
+PAGE_CSS = """
 <style>
 body { background: linear-gradient(180deg, #f7f9fc 0%, #ffffff 100%); }
 header .decoration { display:none; }
@@ -35,9 +286,9 @@ header .decoration { display:none; }
   border:none;
 }
 .small-muted { color:#6b7280; font-size:13px; }
-.table-wrap { max-height:360px; overflow:auto; }
 </style>
-""", unsafe_allow_html=True)
+"""
+HEADER_HTML = '<div class="logo-row"><div><div class="h1">ICS Converter</div><div class="h1-sub">by Nive Solutions — Convert .ics to CSV, Excel, JSON, ZIP, Parquet</div></div></div>'
 
 # --- Header ---
 with st.container():
@@ -46,7 +297,9 @@ with st.container():
         # Logo: expects 'nive_logo.png' in the same directory
         st.image("nive_logo.png", width=56)
     with cols[1]:
-        st.markdown('<div class="logo-row"><div><div class="h1">ICS Converter</div><div class="h1-sub">by Nive Solutions — Convert .ics to CSV, Excel, JSON, ZIP</div></div></div>', unsafe_allow_html=True)
+        # styles and header text go out as one element; it is re-emitted on every rerun because
+        # Streamlit removes elements a rerun doesn't draw, which would drop the styles
+        st.markdown(PAGE_CSS + HEADER_HTML, unsafe_allow_html=True)
 
 st.markdown("")
 
@@ -60,6 +313,7 @@ with st.container():
     uploaded_files = st.file_uploader("Upload .ics files", type=["ics"], accept_multiple_files=True, help="You can upload multiple .ics files", key="ics_uploader")
 
     max_files = 20
+    max_preview_rows = 10_000
     if uploaded_files and len(uploaded_files) > max_files:
         st.warning(f"You uploaded {len(uploaded_files)} files. Only the first {max_files} will be processed.")
         uploaded_files = uploaded_files[:max_files]
@@ -70,94 +324,31 @@ with st.container():
         expand_recurrences = st.checkbox("Expand simple RRULE?", value=False, help="(Simple RRULE expansion is limited)")
     with col2:
         separate_zips = st.checkbox("Export separate CSVs (zipped)", value=True)
+        compress_zip = st.checkbox("Compress ZIP (smaller, slower)", value=False)
     with col3:
         combined_sheet = st.checkbox("Export single Excel workbook", value=True)
 
     st.markdown("---")
 
-    # Basic ICS parser functions
-    def unfold_ics(text):
-        # Unfold lines folded per RFC: lines that start with space or tab are continuations
-        return re.sub(r'\\r?\\n[ \\t]+', '', text)
-
-    def parse_props(block):
-        # Build dict of properties: property name -> list of values
-        props = {}
-        for line in block.splitlines():
-            if not line.strip(): continue
-            if ':' not in line:
-                # fallback: skip
-                continue
-            left, val = line.split(':', 1)
-            # property may have parameters: e.g., DTSTART;TZID=Asia/Kolkata
-            prop = left.split(';')[0].upper()
-            val = val.strip()
-            props.setdefault(prop, []).append(val)
-        return props
-
-    def parse_ics_text(text):
-        # returns list of event dicts
-        text = unfold_ics(text)
-        vevents = re.split(r'BEGIN:VEVENT', text, flags=re.IGNORECASE)[1:]
-        events = []
-        for v in vevents:
-            # stop at END:VEVENT
-            v = v.split('END:VEVENT')[0]
-            props = parse_props(v)
-            # pick common fields, take first value if multiple
-            ev = {
-                'UID': props.get('UID', [''])[0],
-                'SUMMARY': props.get('SUMMARY', [''])[0],
-                'DESCRIPTION': props.get('DESCRIPTION', [''])[0],
-                'LOCATION': props.get('LOCATION', [''])[0],
-                'DTSTART': props.get('DTSTART', [''])[0],
-                'DTEND': props.get('DTEND', [''])[0],
-                'RRULE': props.get('RRULE', [''])[0],
-                'ORGANIZER': props.get('ORGANIZER', [''])[0],
-                'ATTENDEE': ';'.join(props.get('ATTENDEE', [])) if props.get('ATTENDEE') else ''
-            }
-            events.append(ev)
-        return events
-
-    def normalize_dt(dt_str):
-        if not dt_str: return ''
-        # simple normalizer: remove timezone params if present and parse common forms
-        # handle forms: 20250917T153000Z or 20250917T153000 or 2025-09-17T15:30:00
-        dt = dt_str
-        # remove extra params like "TZID=..."
-        if dt_str.upper().startswith('TZID='):
-            # value may be like: TZID=Asia/Kolkata:20250917T153000
-            parts = dt_str.split(':', 1)
-            if len(parts) == 2:
-                dt = parts[1]
-        # strip trailing Z
-        dt = dt.rstrip('Z')
-        # try parse known formats
-        fmt_candidates = ['%Y%m%dT%H%M%S', '%Y%m%dT%H%M', '%Y-%m-%dT%H:%M:%S', '%Y%m%d']
-        for fmt in fmt_candidates:
-            try:
-                return datetime.strptime(dt, fmt).isoformat()
-            except Exception:
-                continue
-        # fallback: return raw
-        return dt_str
-
     if uploaded_files:
         all_parsed = []  # list of (filename, events)
+        uploads = []  # (filename, content digest) of each parsed upload; the cache key for the exports
+        columns = {name: [] for name in EXPORT_COLUMNS}  # master table, one list per column
         total_events = 0
         errors = []
-        for f in uploaded_files:
-            try:
-                raw = f.read().decode('utf-8', errors='ignore')
-                events = parse_ics_text(raw)
-                # normalize dates
-                for ev in events:
-                    ev['DTSTART_ISO'] = normalize_dt(ev.get('DTSTART',''))
-                    ev['DTEND_ISO'] = normalize_dt(ev.get('DTEND',''))
-                all_parsed.append((f.name, events))
-                total_events += len(events)
-            except Exception as e:
-                errors.append((f.name, str(e)))
+        # parse uploads concurrently; results come back in upload order
+        with ThreadPoolExecutor(max_workers=min(8, len(uploaded_files))) as pool:
+            results = list(pool.map(parse_upload, uploaded_files))
+        for filename, digest, events, error in results:
+            if error is not None:
+                errors.append((filename, error))
+                continue
+            all_parsed.append((filename, events))
+            uploads.append((filename, digest))
+            columns['file'].extend([filename] * len(events))
+            for name, field in EVENT_FIELDS.items():
+                columns[name].extend(ev.get(field,'') for ev in events)
+            total_events += len(events)
 
         st.markdown(f"**Files processed:** {len(all_parsed)}  •  **Total events:** {total_events}")
         if errors:
@@ -165,123 +356,45 @@ with st.container():
             for fn, msg in errors:
                 st.write(f"- {fn}: {msg}")
 
-        # Preview combined table
-        preview_df = pd.DataFrame()
-        preview_rows = []
-        for filename, events in all_parsed:
-            for ev in events:
-                row = {
-                    'file': filename,
-                    'uid': ev.get('UID',''),
-                    'summary': ev.get('SUMMARY',''),
-                    'start': ev.get('DTSTART_ISO',''),
-                    'end': ev.get('DTEND_ISO',''),
-                    'location': ev.get('LOCATION',''),
-                    'description': ev.get('DESCRIPTION',''),
-                    'rrule': ev.get('RRULE',''),
-                }
-                preview_rows.append(row)
-        if preview_rows:
-            preview_df = pd.DataFrame(preview_rows)
-            st.markdown("**Preview (first 200 rows):**")
-            st.markdown('<div class="table-wrap">', unsafe_allow_html=True)
-            st.dataframe(preview_df.head(200))
-            st.markdown('</div>', unsafe_allow_html=True)
+        # Master table, built once and reused by the preview and all exports
+        master_df = pd.DataFrame(columns, columns=EXPORT_COLUMNS, dtype=str, copy=False)
+        # low-cardinality columns: store as categories (one small dictionary plus integer codes)
+        master_df['file'] = master_df['file'].astype('category')
+        master_df['rrule'] = master_df['rrule'].astype('category')
+        if not master_df.empty:
+            # st.dataframe only sends the rows in view, so pass the table as-is (capped for very large uploads)
+            st.markdown(f"**Preview (first {max_preview_rows:,} rows):**" if len(master_df) > max_preview_rows else "**Preview:**")
+            st.dataframe(master_df if len(master_df) <= max_preview_rows else master_df.head(max_preview_rows), height=360)
         else:
             st.info("No events found in uploaded files.")
 
         st.markdown("---")
         st.markdown("### Export options")
 
-        # Helper exporters
-        def to_csv_bytes(df):
-            return df.to_csv(index=False).encode('utf-8')
-
-        def generate_combined_csv():
-            if preview_df.empty:
-                return None
-            return to_csv_bytes(preview_df)
-
-        def generate_separate_csvs_zip():
-            mem_zip = BytesIO()
-            with zipfile.ZipFile(mem_zip, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
-                for filename, events in all_parsed:
-                    rows = []
-                    for ev in events:
-                        rows.append({
-                            'uid': ev.get('UID',''),
-                            'summary': ev.get('SUMMARY',''),
-                            'start': ev.get('DTSTART_ISO',''),
-                            'end': ev.get('DTEND_ISO',''),
-                            'location': ev.get('LOCATION',''),
-                            'description': ev.get('DESCRIPTION',''),
-                            'rrule': ev.get('RRULE',''),
-                        })
-                    df = pd.DataFrame(rows)
-                    safe_name = re.sub(r'[^0-9A-Za-z_.-]', '_', filename)
-                    csv_bytes = to_csv_bytes(df)
-                    zf.writestr(safe_name + '.csv', csv_bytes)
-            mem_zip.seek(0)
-            return mem_zip.read()
-
-        def generate_excel_bytes():
-            out = BytesIO()
-            with pd.ExcelWriter(out, engine='openpyxl') as writer:
-                for filename, events in all_parsed:
-                    rows = []
-                    for ev in events:
-                        rows.append({
-                            'uid': ev.get('UID',''),
-                            'summary': ev.get('SUMMARY',''),
-                            'start': ev.get('DTSTART_ISO',''),
-                            'end': ev.get('DTEND_ISO',''),
-                            'location': ev.get('LOCATION',''),
-                            'description': ev.get('DESCRIPTION',''),
-                            'rrule': ev.get('RRULE',''),
-                        })
-                    df = pd.DataFrame(rows)
-                    sheet_name = filename[:31] if filename else 'sheet'
-                    safe_name = re.sub(r'[^0-9A-Za-z_]', '_', sheet_name)
-                    try:
-                        df.to_excel(writer, sheet_name=safe_name[:31], index=False)
-                    except Exception:
-                        # fallback: write to a default sheet if name fails
-                        df.to_excel(writer, sheet_name='sheet_'+str(hash(filename))[:10], index=False)
-            out.seek(0)
-            return out.read()
-
-        def generate_json_bytes(separate=False):
-            if separate:
-                payload = { fn: events for fn, events in all_parsed }
-            else:
-                payload = []
-                for fn, events in all_parsed:
-                    for ev in events:
-                        o = ev.copy()
-                        o['file'] = fn
-                        payload.append(o)
-            return json.dumps(payload, indent=2).encode('utf-8')
+        uploads = tuple(uploads)
+        # identifies this set of uploads, for the prepared-export flags
+        upload_id = hashlib.sha256(repr(uploads).encode('utf-8')).hexdigest()
 
         # Buttons and downloads
-        colA, colB, colC, colD = st.columns(4)
+        colA, colB, colC, colD, colE = st.columns(5)
         with colA:
-            csv_bytes = generate_combined_csv()
+            csv_bytes = generate_combined_csv(uploads, master_df)
             if csv_bytes is not None:
                 st.download_button("Download combined CSV", data=csv_bytes, file_name="events_combined.csv", mime="text/csv", key="dl_combined_csv")
             else:
                 st.button("Download combined CSV", disabled=True)
         with colB:
-            zip_bytes = generate_separate_csvs_zip()
-            st.download_button("Download separate CSVs (ZIP)", data=zip_bytes, file_name="events_individual_csvs.zip", mime="application/zip", key="dl_zip")
+            compresslevel = 6 if compress_zip else 1
+            prepared_download_button("Prepare separate CSVs (ZIP)", "Download separate CSVs (ZIP)", lambda: generate_separate_csvs_zip(uploads, master_df, compresslevel=compresslevel), file_name="events_individual_csvs.zip", mime="application/zip", key="dl_zip", upload_id=upload_id)
         with colC:
             if combined_sheet:
-                excel_bytes = generate_excel_bytes()
-                st.download_button("Download Excel workbook", data=excel_bytes, file_name="events_workbook.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="dl_excel")
+                prepared_download_button("Prepare Excel workbook", "Download Excel workbook", lambda: generate_excel_bytes(uploads, master_df), file_name="events_workbook.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="dl_excel", upload_id=upload_id)
             else:
                 st.button("Download Excel workbook", disabled=True)
         with colD:
-            json_bytes = generate_json_bytes(separate=False)
-            st.download_button("Download JSON (combined)", data=json_bytes, file_name="events.json", mime="application/json", key="dl_json")
+            prepared_download_button("Prepare JSON (combined)", "Download JSON (combined)", lambda: generate_json_bytes(uploads, all_parsed, separate=False), file_name="events.json", mime="application/json", key="dl_json", upload_id=upload_id)
+        with colE:
+            prepared_download_button("Prepare Parquet", "Download Parquet", lambda: generate_parquet_bytes(uploads, master_df), file_name="events.parquet", mime="application/octet-stream", key="dl_parquet", upload_id=upload_id)
 
         st.markdown("---")
         st.markdown("Small note: this parser handles standard/event fields and simple line-folding. Complex Microsoft/Exchange-specific properties or deep RRULE expansion may require additional logic.")